@@ -1,13 +1,27 @@
+import io
 import os
-import json
+import re
+import asyncio
+import hashlib
+import shelve
+import sqlite3
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import orjson
 from PIL import Image
 import pytesseract
 from fpdf import FPDF
 from fpdf.enums import XPos, YPos
-from ollama import Client  # Ollama client for local LLMs
+from ollama import AsyncClient  # Ollama client for local LLMs
+
+try:
+    from tesserocr import PyTessBaseAPI  # in-process libtesseract binding
+except ImportError:
+    # tesserocr has no wheels for some platforms; fall back to the tesseract CLI
+    PyTessBaseAPI = None
 
 # ------------- CONFIG -------------
 user_name = "NickoLaygo"  # user name for PDF filename
@@ -16,55 +30,298 @@ images_per_page = 3  # number of images per page per date
 page_width = 297  # A4 landscape width (mm)
 page_height = 210  # A4 landscape height (mm)
 margin = 10
+image_dpi = 150  # resolution screenshots are downscaled to before embedding
+jpeg_quality = 85  # JPEG quality of embedded screenshots
+font_path = "DejaVuSans.ttf"  # Unicode TTF font (helvetica is used if missing)
+bold_font_path = "DejaVuSans-Bold.ttf"
 ollama_model = "mistral:latest"
+ollama_keep_alive = "30m"  # keep the model loaded between requests
+ocr_workers = os.cpu_count() or 1  # parallel OCR threads
+ocr_cache_file = "ocr_cache.sqlite"  # OCR results reused across runs
+llm_cache_file = "llm_cache.db"  # page_name/summary answers reused across runs
+llm_batch_size = 4  # OCR chunks per Ollama request (num_ctx is sized to fit)
+llm_parallel = 4  # concurrent Ollama requests (match OLLAMA_NUM_PARALLEL)
+max_ocr_chars = 800  # OCR characters per screenshot sent to the LLM
 # ----------------------------------
 
-# Make sure tesseract is reachable (adjust path if needed)
+# Make sure tesseract is reachable (adjust paths if needed)
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+tessdata_path = r"C:\Program Files\Tesseract-OCR\tessdata"
+
+# Per OCR thread: a tesserocr API (not thread-safe) and an OCR cache connection
+_ocr_local = threading.local()
 
 # Initialize Ollama client
-client = Client()
+async_client = AsyncClient()
+
+# Bump whenever a prompt changes so cached LLM answers are regenerated
+LLM_PROMPT_VERSION = "v1"
+
+# Shared page_name/summary instructions for the single and batch prompts
+PAGE_AND_SUMMARY_RULES = (
+    "1) page_name: Find who originally posted this (the main poster, not commenters). Look for:\n"
+    "   - Facebook page names (like 'One Batangas', 'MMDA', 'GMA News')\n"
+    "   - Facebook group names (like 'Batangas Buy and Sell', 'Calamba Updates')\n"
+    "   - Individual person's name who made the original post\n"
+    "   IGNORE: commenters, people who liked/reacted, sponsored content labels, timestamps, and UI elements.\n"
+    "   The poster's name is usually at the TOP of the post, before the main content.\n"
+    "   Return 'Unknown' only if you truly cannot find the original poster.\n\n"
+    "2) summary: Write a concise summary (MAX 3 sentences) that MUST START with 'This post is' and describe:\n"
+    "   - What the original post is about (main content)\n"
+    "   - General sentiment/views of commenters if there are comments (e.g., 'supportive', 'mixed reactions', 'critical')\n"
+    "   Focus on substance, not technical details. Keep it brief and readable.\n\n"
+)
+
+# Context window for every Ollama request, sized for a full batch prompt
+# (~3 chars per token, 500 chars of prompt framing) plus ~200 answer tokens
+# per chunk. Fixed for the run, since a different num_ctx reloads the model.
+_max_chunk_chars = images_per_page * (max_ocr_chars + 2)
+_max_prompt_chars = (
+    len(PAGE_AND_SUMMARY_RULES) + 500 + llm_batch_size * (_max_chunk_chars + 8)
+)
+_num_ctx_tokens = _max_prompt_chars // 3 + llm_batch_size * 200
+llm_num_ctx = max(2048, -(-_num_ctx_tokens // 1024) * 1024)  # round up to 1024
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+# "Screenshot_2025-08-24-18-30-16-438.png" -> "2025-08-24"
+DATE_RE = re.compile(r"_(\d{4}-\d{2}-\d{2})-")
+# "Posted by One Batangas" -> "One Batangas" (fallback page_name extraction)
+INDICATOR_RE = re.compile(
+    r"(posted by|shared by|page:|group:|from:|source:)\s*(.+)", re.IGNORECASE
+)
+# Facebook UI text, reactions and comment lines that are never the poster's name
+SKIP_RE = re.compile(
+    r"like|comment|share|follow|sponsored|mins|hrs|days|ago|just now|yesterday"
+    r"|replied|reacted|tagged|wrote:|said:|view|replies|see more|translate|edited"
+    r"|^reply|^see all"
+    r"|👍|❤️|😂|😮|😢|😡",
+    re.IGNORECASE,
+)
+# Outermost JSON object / array in a model answer (first opener to last closer)
+JSON_OBJECT_RE = re.compile(rb"\{.*\}", re.DOTALL)
+JSON_ARRAY_RE = re.compile(rb"\[.*\]", re.DOTALL)
+# Whitespace following a sentence-ending mark
+SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+")
+
+# layout constants
+top_margin = margin
+title_height = 12 + 4  # approx
+reserved_context = 40  # reserved vertical space for context area at bottom
+max_img_area_height = (
+    page_height - top_margin - title_height - reserved_context - 10
+)  # safety margin
+spacing = 5  # gap between images in a row
+img_y = top_margin + title_height  # top of the image row
+# initial width per image for a row of n images (only the last chunk of a
+# date can hold fewer than images_per_page)
+target_widths = {
+    n: (page_width - 2 * margin - spacing * (n - 1)) / n
+    for n in range(1, images_per_page + 1)
+}
+
+# Largest box (px) a screenshot can fill on a page at image_dpi
+max_img_px = (
+    int((page_width - 2 * margin) / 25.4 * image_dpi),
+    int(max_img_area_height / 25.4 * image_dpi),
+)
+
+
+# Use the Unicode TTF font when available; core helvetica is latin-1 only
+unicode_font = os.path.exists(font_path) and os.path.exists(bold_font_path)
+pdf_font = "DejaVu" if unicode_font else "helvetica"
+
+# Typographic punctuation -> ASCII, applied in one pass by safe_text
+_TRANS = str.maketrans(
+    {
+        "\u2014": "-",  # em dash
+        "\u2013": "-",  # en dash
+        "\u201c": '"',
+        "\u201d": '"',
+        "\u2018": "'",
+        "\u2019": "'",
+    }
+)
 
 
 # --- Helpers ---
 def safe_text(text: str) -> str:
-    """Replace problematic unicode with safe equivalents and force latin-1 fallback for fpdf."""
-    if text is None:
+    """Replace problematic unicode with safe equivalents (latin-1 fallback without the TTF font)."""
+    if not text:
         return ""
-    replacements = {
-        "—": "-",
-        "–": "-",
-        """: '"',
-        """: '"',
-        "'": "'",
-    }
-    for bad, good in replacements.items():
-        text = text.replace(bad, good)
+    text = text.translate(_TRANS)
+    if unicode_font:
+        return text
     # encode to latin-1 with replacement to avoid FPDF errors (it will strip unsupported chars)
     return text.encode("latin-1", "replace").decode("latin-1")
 
 
 def extract_date_from_filename(filename):
     """Extract YYYY-MM-DD from your filename format Screenshot_YYYY-MM-DD-HH-..."""
-    try:
-        parts = filename.split("_")[1]  # "2025-08-24-18-30-16-438"
-        date = "-".join(parts.split("-")[:3])  # "2025-08-24"
-        return date
-    except Exception:
-        return "Unknown"
+    m = DATE_RE.search(filename)
+    return m.group(1) if m else "Unknown"
+
+
+def get_ocr_cache():
+    """Return this thread's connection to ocr_cache_file, creating it on first use."""
+    cache = getattr(_ocr_local, "cache", None)
+    if cache is None:
+        cache = sqlite3.connect(ocr_cache_file, timeout=30)
+        cache.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache "
+            "(hash TEXT PRIMARY KEY, text TEXT, mtime REAL)"
+        )
+        _ocr_local.cache = cache
+    return cache
+
+
+def get_tess_api():
+    """Return this thread's PyTessBaseAPI (None if it fails to init), creating it on first use."""
+    if not hasattr(_ocr_local, "api"):
+        try:
+            if os.path.isdir(tessdata_path):
+                _ocr_local.api = PyTessBaseAPI(path=tessdata_path)
+            else:
+                _ocr_local.api = PyTessBaseAPI()  # libtesseract's default tessdata
+        except RuntimeError:
+            _ocr_local.api = None  # e.g. no language data; use the tesseract CLI
+    return _ocr_local.api
 
 
-def ocr_text_from_image(img_path):
-    """Run OCR and return raw text."""
+def ocr_text_from_image(img):
+    """Run OCR on an opened PIL image and return raw text."""
     try:
-        img = Image.open(img_path)
-        txt = pytesseract.image_to_string(img)
+        api = get_tess_api() if PyTessBaseAPI is not None else None
+        if api is not None:
+            # libtesseract releases the GIL while recognizing, so threads scale
+            api.SetImage(img)
+            txt = api.GetUTF8Text()
+        else:
+            txt = pytesseract.image_to_string(img)
         return txt.strip()
     except Exception as e:
         return f"[OCR error: {e}]"
 
 
-def call_mistral_for_page_and_summary(ocr_text_combined):
+def preprocess(img_path, ocr_text=None):
+    """
+    Open img_path once and return {"text", "size", "jpeg"}: its OCR text
+    (skipped when ocr_text is already known), pixel size, and JPEG bytes
+    downscaled to the largest box it can fill on a page.
+    "size" and "jpeg" are None if the image can't be read.
+    """
+    info = {"text": ocr_text, "size": None, "jpeg": None}
+    try:
+        with Image.open(img_path) as im:
+            info["size"] = im.size  # read from the header, before any decode
+            if info["text"] is None:
+                info["text"] = ocr_text_from_image(im)
+            # without OCR, thumbnail() decodes JPEG sources at reduced scale (draft)
+            im.thumbnail(max_img_px, Image.LANCZOS)
+            bio = io.BytesIO()
+            im.convert("RGB").save(bio, format="JPEG", quality=jpeg_quality)
+            info["jpeg"] = bio.getvalue()
+    except Exception as e:
+        if info["text"] is None:
+            info["text"] = f"[OCR error: {e}]"
+    return info
+
+
+def file_hash(path):
+    """Return the blake2b hex digest of a file's contents, read in 64 KiB blocks."""
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cached_preprocess(img_path):
+    """
+    preprocess() with the OCR text cached in ocr_cache_file by content hash,
+    so only new or changed screenshots go through Tesseract.
+    """
+    try:
+        cache = get_ocr_cache()
+        digest = file_hash(img_path)
+        row = cache.execute(
+            "SELECT text FROM ocr_cache WHERE hash = ?", (digest,)
+        ).fetchone()
+    except (OSError, sqlite3.Error):
+        # unreadable file or cache: preprocess() degrades to "[OCR error]" text
+        return preprocess(img_path)
+    info = preprocess(img_path, row[0] if row else None)
+    # failed images are not cached so they are retried on the next run
+    if row is None and not info["text"].startswith("[OCR error"):
+        try:
+            with cache:
+                cache.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (hash, text, mtime) "
+                    "VALUES (?, ?, ?)",
+                    (digest, info["text"], os.path.getmtime(img_path)),
+                )
+        except (OSError, sqlite3.Error):
+            pass  # the result is still used; it just isn't cached
+    return info
+
+
+def trim_ocr_text(ocr_text):
+    """Drop short (UI noise) lines and cap one screenshot's OCR text for the prompt."""
+    lines = [ln for ln in ocr_text.splitlines() if len(ln.strip()) >= 3]
+    return "\n".join(lines)[:max_ocr_chars]
+
+
+def llm_cache_key(text):
+    """Cache key for an LLM answer: prompt version + input text."""
+    return hashlib.sha256((LLM_PROMPT_VERSION + text).encode("utf-8")).hexdigest()
+
+
+def load_llm_result(key):
+    """Return the cached (page_name, summary) for key, or None on a miss."""
+    with shelve.open(llm_cache_file) as cache:
+        cached = cache.get(key)
+    if cached is None:
+        return None
+    data = orjson.loads(cached)
+    return data["page_name"], data["summary"]
+
+
+def save_llm_result(key, page_name, summary):
+    """Store a (page_name, summary) answer under key."""
+    with shelve.open(llm_cache_file) as cache:
+        cache[key] = orjson.dumps({"page_name": page_name, "summary": summary})
+
+
+def response_content(response):
+    """Extract the message text from an Ollama chat response (object or dict)."""
+    if hasattr(response, "message") and hasattr(response.message, "content"):
+        # If response has message.content attribute
+        return response.message.content or ""
+    if isinstance(response, dict) and "message" in response:
+        # If response is dict with message key
+        if isinstance(response["message"], dict):
+            return response["message"].get("content", "") or ""
+        if hasattr(response["message"], "content"):
+            return response["message"].content or ""
+        return ""
+    # Fallback - convert to string and hope for the best
+    return str(response)
+
+
+def normalize_page_and_summary(data):
+    """Turn a parsed {"page_name", "summary"} answer into a clean tuple."""
+    page_name = data.get("page_name", "Unknown") or "Unknown"
+    summary = data.get("summary", "") or ""
+
+    # Ensure summary starts with "This post is"
+    if summary and not summary.lower().startswith("this post is"):
+        summary = "This post is " + summary
+    elif not summary:
+        summary = "This post is about the content shown in the screenshots."
+
+    return (page_name.strip(), summary.strip())
+
+
+async def call_mistral_for_page_and_summary(ocr_text_combined):
     """
     Ask mistral:latest to (1) find page/source name from OCR text and
     (2) produce a concise summary that STARTS with 'This post is'.
@@ -73,73 +330,42 @@ def call_mistral_for_page_and_summary(ocr_text_combined):
     if not ocr_text_combined.strip():
         return "Unknown", "This post is not available due to missing context."
 
+    cache_key = llm_cache_key(ocr_text_combined)
+    cached = load_llm_result(cache_key)
+    if cached is not None:
+        return cached
+
     prompt = (
         "You will be given OCR text from a Facebook screenshot. Look for the name of the Facebook page, group, or person who ORIGINALLY POSTED this content. "
         "Return a JSON object with keys: page_name and summary.\n\n"
-        "1) page_name: Find who originally posted this (the main poster, not commenters). Look for:\n"
-        "   - Facebook page names (like 'One Batangas', 'MMDA', 'GMA News')\n"
-        "   - Facebook group names (like 'Batangas Buy and Sell', 'Calamba Updates')\n"
-        "   - Individual person's name who made the original post\n"
-        "   IGNORE: commenters, people who liked/reacted, sponsored content labels, timestamps, and UI elements.\n"
-        "   The poster's name is usually at the TOP of the post, before the main content.\n"
-        "   Return 'Unknown' only if you truly cannot find the original poster.\n\n"
-        "2) summary: Write a concise summary (MAX 3 sentences) that MUST START with 'This post is' and describe:\n"
-        "   - What the original post is about (main content)\n"
-        "   - General sentiment/views of commenters if there are comments (e.g., 'supportive', 'mixed reactions', 'critical')\n"
-        "   Focus on substance, not technical details. Keep it brief and readable.\n\n"
-        "Return ONLY valid JSON. OCR TEXT:\n\n" + ocr_text_combined
+        + PAGE_AND_SUMMARY_RULES
+        + "Return ONLY valid JSON. OCR TEXT:\n\n"
+        + ocr_text_combined
     )
 
     try:
-        response = client.chat(
-            model=ollama_model, messages=[{"role": "user", "content": prompt}]
+        response = await async_client.chat(
+            model=ollama_model,
+            messages=[{"role": "user", "content": prompt}],
+            keep_alive=ollama_keep_alive,
+            options={"num_ctx": llm_num_ctx},
         )
 
-        # Fixed: Properly extract content from Ollama response
-        raw_content = ""
-        if hasattr(response, "message") and hasattr(response.message, "content"):
-            # If response has message.content attribute
-            raw_content = response.message.content
-        elif isinstance(response, dict) and "message" in response:
-            # If response is dict with message key
-            if isinstance(response["message"], dict):
-                raw_content = response["message"].get("content", "")
-            elif hasattr(response["message"], "content"):
-                raw_content = response["message"].content
-        else:
-            # Fallback - convert to string and hope for the best
-            raw_content = str(response)
+        raw_content = response_content(response)
 
         if not raw_content:
             return "Unknown", "This post is not available due to empty response."
 
         # Try to extract JSON from the response
-        json_text = None
         raw_content = raw_content.strip()
-
-        if raw_content.startswith("{") and raw_content.endswith("}"):
-            json_text = raw_content
-        else:
-            # find first { and last } to extract JSON
-            first = raw_content.find("{")
-            last = raw_content.rfind("}")
-            if first != -1 and last != -1 and last > first:
-                json_text = raw_content[first : last + 1]
-
-        if json_text:
+        m = JSON_OBJECT_RE.search(raw_content.encode("utf-8"))
+        if m:
             try:
-                data = json.loads(json_text)
-                page_name = data.get("page_name", "Unknown") or "Unknown"
-                summary = data.get("summary", "") or ""
-
-                # Ensure summary starts with "This post is"
-                if summary and not summary.lower().startswith("this post is"):
-                    summary = "This post is " + summary
-                elif not summary:
-                    summary = "This post is about the content shown in the screenshots."
-
-                return (page_name.strip(), summary.strip())
-            except json.JSONDecodeError:
+                data = orjson.loads(m.group())
+                page_name, summary = normalize_page_and_summary(data)
+                save_llm_result(cache_key, page_name, summary)
+                return page_name, summary
+            except orjson.JSONDecodeError:
                 # JSON parsing failed, fall back to text processing
                 pass
 
@@ -149,38 +375,11 @@ def call_mistral_for_page_and_summary(ocr_text_combined):
         # Look for obvious page indicators in the text
         page_name = "Unknown"
         for line in lines:
-            # Look for Facebook-specific indicators
-            if any(
-                keyword in line.lower()
-                for keyword in [
-                    "posted by",
-                    "shared by",
-                    "page:",
-                    "group:",
-                    "from:",
-                    "source:",
-                    "admin",
-                    "moderator",
-                    "official",
-                    "verified",
-                ]
-            ):
-                # Extract the part after common indicators
-                for indicator in [
-                    "posted by",
-                    "shared by",
-                    "page:",
-                    "group:",
-                    "from:",
-                    "source:",
-                ]:
-                    if indicator in line.lower():
-                        potential_page = line.lower().split(indicator, 1)[1].strip()
-                        if len(potential_page) > 3 and len(potential_page) < 50:
-                            page_name = potential_page.title()  # Capitalize properly
-                            break
-                if page_name != "Unknown":
-                    break
+            # Extract the part after common indicators
+            m = INDICATOR_RE.search(line)
+            if m and 3 < len(m.group(2).strip()) < 50:
+                page_name = m.group(2).strip().title()  # Capitalize properly
+                break
 
         # If still unknown, try to find page names from common Facebook patterns in OCR
         if page_name == "Unknown" and ocr_text_combined:
@@ -188,42 +387,12 @@ def call_mistral_for_page_and_summary(ocr_text_combined):
             # Look for lines that might be the original poster (usually at the top)
             for line in ocr_lines[:3]:  # Check first 3 lines only for poster name
                 line = line.strip()
-                # Skip very short or very long lines, and common UI elements
+                # Skip very short or very long lines, common UI elements and reactions
                 if (
                     3 < len(line) < 50
-                    and not any(
-                        skip in line.lower()
-                        for skip in [
-                            "like",
-                            "comment",
-                            "share",
-                            "follow",
-                            "sponsored",
-                            "mins",
-                            "hrs",
-                            "days",
-                            "ago",
-                            "just now",
-                            "yesterday",
-                            "replied",
-                            "reacted",
-                            "tagged",
-                            "wrote:",
-                            "said:",
-                            "view",
-                            "replies",
-                            "see more",
-                            "translate",
-                            "edited",
-                        ]
-                    )
-                    and
+                    and not SKIP_RE.search(line)
                     # Avoid lines that look like comments or reactions
-                    not line.endswith("·")  # FB timestamp separator
-                    and not any(
-                        char in line for char in ["👍", "❤️", "😂", "😮", "😢", "😡"]
-                    )  # reactions
-                    and not line.lower().startswith(("reply", "comment", "see all"))
+                    and not line.endswith("·")  # FB timestamp separator
                 ):
                     page_name = line
                     break
@@ -254,116 +423,175 @@ def call_mistral_for_page_and_summary(ocr_text_combined):
         )
 
 
-# --- Group images by date ---
-images_by_date = defaultdict(list)
-for file in os.listdir(images_folder):
-    if file.lower().endswith((".png", ".jpg", ".jpeg")):
-        date = extract_date_from_filename(file)
-        file_path = os.path.join(images_folder, file)
-        images_by_date[date].append(file_path)
-
-# Sort file lists for deterministic order
-for k in images_by_date:
-    images_by_date[k].sort()
-
-# --- Determine date range for filename ---
-all_dates = sorted(images_by_date.keys())
-if all_dates:
-    start_date = datetime.strptime(all_dates[0], "%Y-%m-%d")
-    end_date = datetime.strptime(all_dates[-1], "%Y-%m-%d")
-
-    # Format dates as "Month Day"
-    start_formatted = start_date.strftime("%B %d")
-    end_formatted = end_date.strftime("%B %d")
-
-    # Create filename
-    if start_formatted == end_formatted:
-        # Same date
-        output_pdf = f"{user_name} - {start_formatted}.pdf"
-    else:
-        # Date range
-        output_pdf = f"{user_name} - {start_formatted} - {end_formatted}.pdf"
-else:
-    # Fallback if no dates found
-    output_pdf = f"{user_name} - Screenshots.pdf"
-
-# --- Create PDF (landscape A4) ---
-pdf = FPDF(orientation="L", unit="mm", format="A4")
-pdf.set_auto_page_break(auto=False)
-pdf.set_font("helvetica", size=12)
-
-# layout constants
-top_margin = margin
-title_height = 12 + 4  # approx
-reserved_context = 40  # reserved vertical space for context area at bottom
-max_img_area_height = (
-    page_height - top_margin - title_height - reserved_context - 10
-)  # safety margin
+async def call_mistral_batch(ocr_texts):
+    """
+    Ask mistral:latest for page_name and summary of several OCR blocks in one
+    request. Returns a list of (page_name, summary) aligned with ocr_texts, or
+    None if the answer is not a JSON array with one object per block.
+    """
+    blocks = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(ocr_texts))
+    prompt = (
+        f"You will be given OCR text from {len(ocr_texts)} Facebook screenshots, as blocks indexed "
+        f"[0]..[{len(ocr_texts) - 1}]. For each block, look for the name of the Facebook page, group, or person who ORIGINALLY POSTED that content. "
+        "Return a JSON array where element i is an object with keys page_name and summary for block [i].\n\n"
+        + PAGE_AND_SUMMARY_RULES
+        + "Return ONLY a valid JSON array. OCR BLOCKS:\n\n"
+        + blocks
+    )
 
-from fpdf.enums import XPos, YPos  # deprecation-safe cell movement
+    try:
+        response = await async_client.chat(
+            model=ollama_model,
+            messages=[{"role": "user", "content": prompt}],
+            keep_alive=ollama_keep_alive,
+            options={"num_ctx": llm_num_ctx},
+        )
+        raw_content = response_content(response).strip()
+
+        m = JSON_ARRAY_RE.search(raw_content.encode("utf-8"))
+        if m is None:
+            return None
+        data = orjson.loads(m.group())
+        if not isinstance(data, list) or len(data) != len(ocr_texts):
+            return None
+        if not all(isinstance(item, dict) for item in data):
+            return None
+        return [normalize_page_and_summary(item) for item in data]
+    except Exception:
+        return None
 
-for date, files in sorted(images_by_date.items()):
-    # chunk per images_per_page
-    for i in range(0, len(files), images_per_page):
-        chunk = files[i : i + images_per_page]
-        part_num = (i // images_per_page) + 1
 
-        # --- OCR for this chunk (per-image) ---
-        ocr_texts = []
-        for img_path in chunk:
-            ocr_texts.append(ocr_text_from_image(img_path))
-        combined_ocr_text = "\n\n".join(ocr_texts)
+async def analyze_chunks(chunks, ocr_futures):
+    """
+    Return {chunk_id: (page_name, summary)} for every (date, part_num, paths)
+    chunk. Chunks are handled in groups of llm_batch_size that each wait only
+    for their own screenshots' OCR future, so the model works on early chunks
+    while later ones are still being OCR'd. Cached answers are reused; the rest
+    of a group goes to the model in one request, falling back to one request
+    per chunk when the batch answer is unusable. Up to llm_parallel requests
+    are in flight at once.
+    """
+    results = {}
+    semaphore = asyncio.Semaphore(llm_parallel)
 
-        # --- Ask model for page_name and summary (for this chunk) ---
-        page_name_raw, summary_raw = call_mistral_for_page_and_summary(
-            combined_ocr_text
+    async def chunk_text(paths):
+        infos = await asyncio.gather(
+            *(asyncio.wrap_future(ocr_futures[p]) for p in paths)
+        )
+        return "\n\n".join(trim_ocr_text(info["text"]) for info in infos)
+
+    async def analyze_group(chunk_ids):
+        texts = {}
+        for chunk_id in chunk_ids:
+            text = await chunk_text(chunks[chunk_id][2])
+            if not text.strip():
+                results[chunk_id] = await call_mistral_for_page_and_summary(text)
+                continue
+            cached = load_llm_result(llm_cache_key(text))
+            if cached is not None:
+                results[chunk_id] = cached
+            else:
+                texts[chunk_id] = text
+        if not texts:
+            return
+
+        async with semaphore:
+            answers = await call_mistral_batch(list(texts.values()))
+            if answers is None:
+                for chunk_id, text in texts.items():
+                    results[chunk_id] = await call_mistral_for_page_and_summary(text)
+                return
+        for (chunk_id, text), (page_name, summary) in zip(texts.items(), answers):
+            save_llm_result(llm_cache_key(text), page_name, summary)
+            results[chunk_id] = (page_name, summary)
+
+    chunk_ids = list(range(len(chunks)))
+    await asyncio.gather(
+        *(
+            analyze_group(chunk_ids[start : start + llm_batch_size])
+            for start in range(0, len(chunk_ids), llm_batch_size)
         )
+    )
+    return results
+
+
+def new_pdf():
+    """Create an empty landscape A4 FPDF with the report fonts registered."""
+    pdf = FPDF(orientation="L", unit="mm", format="A4")
+    pdf.set_auto_page_break(auto=False)
+    if unicode_font:
+        pdf.add_font("DejaVu", "", font_path)
+        pdf.add_font("DejaVu", "B", bold_font_path)
+    pdf.set_font(pdf_font, size=12)
+    return pdf
+
+
+def main():
+    # --- Group images by date ---
+    images_by_date = defaultdict(list)
+    with os.scandir(images_folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTS):
+                date = extract_date_from_filename(entry.name)
+                images_by_date[date].append(entry.path)
+
+    sorted_dates = sorted(images_by_date)
+
+    # --- Determine date range for filename ---
+    if sorted_dates:
+        start_date = datetime.strptime(sorted_dates[0], "%Y-%m-%d")
+        end_date = datetime.strptime(sorted_dates[-1], "%Y-%m-%d")
+
+        # Format dates as "Month Day"
+        start_formatted = start_date.strftime("%B %d")
+        end_formatted = end_date.strftime("%B %d")
+
+        # Create filename
+        if start_formatted == end_formatted:
+            # Same date
+            output_pdf = f"{user_name} - {start_formatted}.pdf"
+        else:
+            # Date range
+            output_pdf = f"{user_name} - {start_formatted} - {end_formatted}.pdf"
+    else:
+        # Fallback if no dates found
+        output_pdf = f"{user_name} - Screenshots.pdf"
+
+    # --- Chunk each date's screenshots per images_per_page ---
+    chunks = []  # (date, part_num, paths)
+    for date in sorted_dates:
+        files = images_by_date[date]
+        files.sort()  # deterministic order within a date
+        for i in range(0, len(files), images_per_page):
+            part_num = (i // images_per_page) + 1
+            chunks.append((date, part_num, files[i : i + images_per_page]))
+
+    # --- Pipeline: open, OCR (cached) and downscale every screenshot once in the
+    # background while the model analyzes chunks whose OCR is already done ---
+    with ThreadPoolExecutor(max_workers=ocr_workers) as ocr_pool:
+        ocr_futures = {
+            p: ocr_pool.submit(cached_preprocess, p)
+            for _, _, chunk in chunks
+            for p in chunk
+        }
+        llm_results = asyncio.run(analyze_chunks(chunks, ocr_futures))
+    preprocessed = {p: future.result() for p, future in ocr_futures.items()}
+
+    # --- Create PDF (landscape A4) ---
+    pdf = new_pdf()
+
+    for chunk_id, (date, part_num, chunk) in enumerate(chunks):
+        page_name_raw, summary_raw = llm_results[chunk_id]
 
         page_name = safe_text(page_name_raw)
         summary = safe_text(summary_raw)
 
-        # Enforce summary starting phrase "This post is"
+        # Enforce summary starting phrase "This post is" and at most 3 sentences
         if not summary.lower().startswith("this post is"):
-            # gently rewrite via the model to ensure the exact phrase if possible
-            rewrite_prompt = (
-                "Rewrite the following paragraph so it STARTS with 'This post is' "
-                "and includes both the main post content AND general commenter sentiment if present. "
-                "Keep it to exactly 3 sentences maximum:\n\n" + summary_raw
+            summary = "This post is " + (
+                summary or "about the content shown in the screenshots."
             )
-            try:
-                resp2 = client.chat(
-                    model=ollama_model,
-                    messages=[{"role": "user", "content": rewrite_prompt}],
-                )
-
-                # Fixed: Properly extract content from rewrite response too
-                rewrite_content = ""
-                if hasattr(resp2, "message") and hasattr(resp2.message, "content"):
-                    rewrite_content = resp2.message.content
-                elif isinstance(resp2, dict) and "message" in resp2:
-                    if isinstance(resp2["message"], dict):
-                        rewrite_content = resp2["message"].get("content", "")
-                    elif hasattr(resp2["message"], "content"):
-                        rewrite_content = resp2["message"].content
-
-                if rewrite_content:
-                    candidate_line = rewrite_content.strip().splitlines()[0].strip()
-                    if candidate_line and candidate_line.lower().startswith(
-                        "this post is"
-                    ):
-                        summary = safe_text(candidate_line)
-                    else:
-                        summary = safe_text("This post is " + summary_raw[:300])
-                else:
-                    summary = safe_text("This post is " + summary_raw[:300])
-            except Exception:
-                # fallback naive prefix
-                summary = safe_text(
-                    "This post is "
-                    + (summary_raw or "about the content shown in the screenshots.")
-                )
-        # final safety
-        summary = safe_text(summary)
+        summary = " ".join(SENTENCE_BREAK_RE.split(summary)[:3])
 
         # --- Compose title text ---
         title = f"Date: {date}"
@@ -372,7 +600,7 @@ for date, files in sorted(images_by_date.items()):
 
         # --- Add PDF page and layout images ---
         pdf.add_page()
-        pdf.set_font("helvetica", "B", 16)
+        pdf.set_font(pdf_font, "B", 16)
         pdf.cell(
             0, 12, safe_text(title), new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C"
         )
@@ -380,46 +608,38 @@ for date, files in sorted(images_by_date.items()):
         pdf.ln(4)
 
         # Compute image widths and heights while preserving aspect ratio
-        available_width = page_width - 2 * margin
-        spacing = 5
         num_imgs = len(chunk)
-        # compute target width per image (initial)
-        target_w = (available_width - (spacing * (num_imgs - 1))) / num_imgs
+        target_w = target_widths[num_imgs]
 
-        # calculate natural heights for each image at that width (using pixel aspect ratio)
-        natural_heights = []
-        pil_images = []
+        # aspect ratio (h/w) of each image, tracking the tallest natural height
+        height_ratios = []
+        max_natural_h = 0.0
         for img_path in chunk:
-            try:
-                im = Image.open(img_path)
-                pil_images.append((img_path, im.width, im.height))
-                natural_h = target_w * (im.height / im.width)
-                natural_heights.append(natural_h)
-            except Exception:
-                pil_images.append((img_path, None, None))
-                natural_heights.append(target_w * 0.75)
+            size = preprocessed[img_path]["size"]
+            ratio = size[1] / size[0] if size else 0.75
+            height_ratios.append(ratio)
+            max_natural_h = max(max_natural_h, target_w * ratio)
 
         # if any natural height exceeds max_img_area_height, scale all down
-        max_natural_h = max(natural_heights) if natural_heights else 0
-        scale_factor = 1.0
-        if max_natural_h > max_img_area_height:
-            scale_factor = max_img_area_height / max_natural_h
+        scale_factor = min(1.0, max_img_area_height / max_natural_h)
 
         final_w = target_w * scale_factor
-        final_heights = [h * scale_factor for h in natural_heights]
+        final_heights = [ratio * final_w for ratio in height_ratios]
+        max_final_h = max_natural_h * scale_factor
 
         # center the row horizontally
         total_row_width = final_w * num_imgs + spacing * (num_imgs - 1)
         start_x = (page_width - total_row_width) / 2
 
-        img_y = top_margin + title_height
-
         x = start_x
-        for idx, (img_path, w_px, h_px) in enumerate(pil_images):
-            h_mm = final_heights[idx]
+        for img_path, h_mm in zip(chunk, final_heights):
+            # each screenshot is drawn once: hand its bytes to this date's PDF
+            jpeg = preprocessed[img_path].pop("jpeg")
+            # embed the original if it couldn't be re-encoded
+            img_src = io.BytesIO(jpeg) if jpeg else img_path
             # draw image
             try:
-                pdf.image(img_path, x=x, y=img_y, w=final_w, h=h_mm)
+                pdf.image(img_src, x=x, y=img_y, w=final_w, h=h_mm)
             except Exception:
                 # fallback: draw without explicit size
                 try:
@@ -429,8 +649,8 @@ for date, files in sorted(images_by_date.items()):
             x += final_w + spacing
 
         # --- Add page name and summary below images ---
-        pdf.set_y(img_y + max(final_heights) + 8)
-        pdf.set_font("helvetica", "B", 12)
+        pdf.set_y(img_y + max_final_h + 8)
+        pdf.set_font(pdf_font, "B", 12)
         # show page name (if unknown, skip or show Unknown)
         if page_name and page_name.lower() != "unknown":
             pdf.cell(
@@ -451,12 +671,20 @@ for date, files in sorted(images_by_date.items()):
                 align="L",
             )
 
-        pdf.set_font("helvetica", "", 11)
+        pdf.set_font(pdf_font, "", 11)
         # summary label + text (wrap automatically using multi_cell)
         pdf.multi_cell(
-            0, 7, safe_text(f"Context: {summary}"), new_x=XPos.LMARGIN, new_y=YPos.NEXT
+            0,
+            7,
+            safe_text(f"Context: {summary}"),
+            new_x=XPos.LMARGIN,
+            new_y=YPos.NEXT,
         )
 
-# Save PDF
-pdf.output(output_pdf)
-print(f"✅ PDF saved as {output_pdf}")
+    # Save PDF
+    pdf.output(output_pdf)
+    print(f"✅ PDF saved as {output_pdf}")
+
+
+if __name__ == "__main__":
+    main()